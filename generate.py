@@ -1,7 +1,6 @@
 ## This module provides function that generates a sudoku board
 
-from dokusan import generators, stats
-from solver import solve
+from dokusan import generators
 import numpy as np
 
 SUDOKU_DIFFICULTY = 100 # The higher the harder
@@ -12,11 +11,6 @@ def generate_board():
 
     generate_board: None -> (listof (listof Nat))
     '''
-    while True:
-        bo = generators.random_sudoku(avg_rank = SUDOKU_DIFFICULTY)
-        if stats.rank(sudoku := bo) < SUDOKU_DIFFICULTY:
-            break
-    los = list(str(bo))
-    lon = [int(str) for str in los]
-    board = np.array(lon).reshape(9, 9)
-    return board
\ No newline at end of file
+    bo = generators.random_sudoku(avg_rank = SUDOKU_DIFFICULTY)
+    digits = np.frombuffer(str(bo).encode(), dtype=np.uint8) - ord("0")
+    return digits.reshape(9, 9)
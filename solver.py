@@ -1,7 +1,26 @@
 ## This module provides functions that solve a sudoku board
 
+import sys
+
 ## The following applies to all functions:
 ## Requires: bo is valid sudoku board (9x9 grid)
+##           nums is a valid sudoku board flattened in row order (81 elements),
+##               the number on position (i, j) is nums[i * 9 + j]
+
+ALL_NUMS = (1 << 9) - 1 # Bitmask with the bits of all 9 numbers set
+NUM_OPTIONS = [bin(mask).count("1") for mask in range(ALL_NUMS + 1)]
+ROWS = [k // 9 for k in range(81)] # Row of each index in nums
+COLS = [k % 9 for k in range(81)] # Column of each index in nums
+BOXES = [k // 27 * 3 + k % 9 // 3
+         for k in range(81)] # 3x3 box of each index in nums
+UNITS = ([[k for k in range(81) if ROWS[k] == i] for i in range(9)] +
+         [[k for k in range(81) if COLS[k] == i] for i in range(9)] +
+         [[k for k in range(81) if BOXES[k] == i]
+          for i in range(9)]) # Indices in each row, column and 3x3 box
+PEERS = [[[(k // 9, k % 9) for k in sorted(set(
+              UNITS[i] + UNITS[9 + j] + UNITS[18 + BOXES[i * 9 + j]])
+              - {i * 9 + j})] for j in range(9)]
+         for i in range(9)] # Positions sharing a unit with each position
 
 def find_empty(bo):
     '''
@@ -25,26 +44,166 @@ def valid(bo, num, pos):
 
     Time: O(1) since length of bo and length of elements of bo are always 9
     '''
-    ## check row
-    for i in range(len(bo[0])):
-        if bo[pos[0]][i] == num and pos[1] != i:
-            return False
-    
-    ## check column 
-    for i in range(len(bo)):
-        if bo[i][pos[1]] == num and pos[0] != i:
+    for i, j in PEERS[pos[0]][pos[1]]:
+        if bo[i][j] == num:
             return False
+    return True
+
+def get_masks(nums):
+    '''
+    Returns the bitmasks of the numbers used in each row, column and 3x3 box
+        of nums, where bit n - 1 of a mask is set if n is used in that unit
 
-    box_cow = pos[1] // 3
-    box_row = pos[0] // 3
+    get_masks: (listof Nat) -> (tupleof (listof Nat) (listof Nat) (listof Nat))
 
-    ## check the box containing pos
-    for i in range(box_row * 3, box_row * 3 + 3):
-        for j in range(box_cow * 3, box_cow * 3 + 3):
-            if bo[i][j] == num and (i, j) != pos:
-                return False
+    Time: O(1) since there are always 81 elements in nums
+    '''
+    row_mask = [0] * 9
+    col_mask = [0] * 9
+    box_mask = [0] * 9
+    for k in range(81):
+        if nums[k] != 0:
+            bit = 1 << (nums[k] - 1)
+            row_mask[ROWS[k]] |= bit
+            col_mask[COLS[k]] |= bit
+            box_mask[BOXES[k]] |= bit
+    return (row_mask, col_mask, box_mask)
 
-    return True
+def find_fewest_options(nums, row_mask, col_mask, box_mask):
+    '''
+    Returns the index of the empty element in nums with the fewest numbers
+        that can be placed in it, along with the bitmask of those numbers
+
+    find_fewest_options: (listof Nat) (listof Nat) (listof Nat) (listof Nat)
+                         -> (anyof (tupleof Nat Nat) None)
+    Requires: row_mask, col_mask, box_mask are the masks of nums
+              (see get_masks)
+
+    Time: O(1) since there are always 81 elements in nums
+    '''
+    fewest = None
+    least = 10
+    for k in range(81):
+        if nums[k] == 0:
+            options = ALL_NUMS & ~(row_mask[ROWS[k]] | col_mask[COLS[k]] |
+                                   box_mask[BOXES[k]])
+            if NUM_OPTIONS[options] < least:
+                fewest = (k, options)
+                least = NUM_OPTIONS[options]
+                if least <= 1:
+                    return fewest
+    return fewest
+
+def find_hidden_single(nums, row_mask, col_mask, box_mask):
+    '''
+    Returns the index of an empty element in nums that is the only place
+        for one of the missing numbers of its row, column or 3x3 box, along
+        with the bit of that number. The bit is 0 if a missing number cannot
+        be placed anywhere in its row, column or 3x3 box
+
+    find_hidden_single: (listof Nat) (listof Nat) (listof Nat) (listof Nat)
+                        -> (anyof (tupleof Nat Nat) None)
+    Requires: row_mask, col_mask, box_mask are the masks of nums
+              (see get_masks)
+
+    Time: O(1) since there are always 27 rows, columns and 3x3 boxes
+    '''
+    for unit in UNITS:
+        used = 0
+        once = 0
+        twice = 0
+        empty = []
+        for k in unit:
+            if nums[k] == 0:
+                options = ALL_NUMS & ~(row_mask[ROWS[k]] | col_mask[COLS[k]] |
+                                       box_mask[BOXES[k]])
+                twice |= once & options
+                once |= options
+                empty.append((k, options))
+            else:
+                used |= 1 << (nums[k] - 1)
+        if once | used != ALL_NUMS:
+            return (unit[0], 0)
+        single = once & ~twice
+        if single:
+            for k, options in empty:
+                if options & single:
+                    options &= single
+                    return (k, options & -options)
+
+def place_bit(nums, row_mask, col_mask, box_mask, k, bit):
+    '''
+    Places the number whose bit in the masks is bit at index k of nums
+
+    Effects: mutates nums, row_mask, col_mask, box_mask
+
+    place_bit: (listof Nat) (listof Nat) (listof Nat) (listof Nat) Nat Nat
+               -> None
+    Requires: nums[k] is empty and the number can be placed there
+    '''
+    nums[k] = bit.bit_length()
+    row_mask[ROWS[k]] |= bit
+    col_mask[COLS[k]] |= bit
+    box_mask[BOXES[k]] |= bit
+
+def remove_bit(nums, row_mask, col_mask, box_mask, k, bit):
+    '''
+    Removes the number whose bit in the masks is bit from index k of nums
+
+    Effects: mutates nums, row_mask, col_mask, box_mask
+
+    remove_bit: (listof Nat) (listof Nat) (listof Nat) (listof Nat) Nat Nat
+                -> None
+    Requires: the number was placed at index k with place_bit
+    '''
+    nums[k] = 0
+    row_mask[ROWS[k]] ^= bit
+    col_mask[COLS[k]] ^= bit
+    box_mask[BOXES[k]] ^= bit
+
+def solve_masks(nums, row_mask, col_mask, box_mask):
+    '''
+    Solves the sudoku board nums whose used numbers are recorded in row_mask,
+        col_mask and box_mask. The empty elements with a single option, and
+        the only places left for a number in a row, column or 3x3 box, are
+        filled in before trying the options of any other element
+
+    Effects: mutates nums, row_mask, col_mask, box_mask
+
+    solve_masks: (listof Nat) (listof Nat) (listof Nat) (listof Nat) -> Bool
+    Requires: row_mask, col_mask, box_mask are the masks of nums
+              (see get_masks)
+
+    Time: O(1) since there are 9 options for a maximum of 81 unassigned numbers
+    '''
+    ## placed holds the numbers placed so far, and choices holds the options
+    ##   left to try at each index along with the length of placed before
+    ##   the index was filled in
+    placed = []
+    choices = []
+    while True:
+        find = find_fewest_options(nums, row_mask, col_mask, box_mask)
+        if not find:
+            return True
+        if NUM_OPTIONS[find[1]] > 1:
+            find = (find_hidden_single(nums, row_mask, col_mask, box_mask)
+                    or find)
+        k, options = find
+        choices.append((k, options, len(placed)))
+
+        while True:
+            if not choices:
+                return False
+            k, options, size = choices[-1]
+            while len(placed) > size:
+                remove_bit(nums, row_mask, col_mask, box_mask, *placed.pop())
+            if options:
+                bit = options & -options
+                choices[-1] = (k, options ^ bit, size)
+                place_bit(nums, row_mask, col_mask, box_mask, k, bit)
+                placed.append((k, bit))
+                break
+            choices.pop()
 
 def solve(bo):
     '''
@@ -56,16 +215,47 @@ def solve(bo):
 
     Time: O(1) since there are 9 options for a maximum of 81 unassigned numbers
     '''
-    find = find_empty(bo)
-    if not find:
-        return True
+    nums = [int(bo[i][j]) for i in range(9) for j in range(9)]
+    row_mask, col_mask, box_mask = get_masks(nums)
+    if not solve_masks(nums, row_mask, col_mask, box_mask):
+        return False
+
+    for k in range(81):
+        bo[ROWS[k]][COLS[k]] = nums[k]
+    return True
+
+def main():
+    '''
+    Solves the sudoku board given as the first command line argument (or
+        typed in if there is none) as 81 digits in row order with 0 for
+        empty elements, and prints the solved board
+
+    Effects: printing to screen
+             may read input
+             exits with an error message if the board is malformed or
+                 cannot be solved
+
+    main: None -> None
+    '''
+    malformed = "The board must be 81 digits in row order, with 0 for empty"
+    if len(sys.argv) > 1:
+        digits = sys.argv[1]
+    else:
+        try:
+            digits = input()
+        except EOFError:
+            sys.exit(malformed)
+    digits = digits.strip()
+    if len(digits) != 81 or not all(c in "0123456789" for c in digits):
+        sys.exit(malformed)
+
+    nums = [int(digit) for digit in digits]
+    row_mask, col_mask, box_mask = get_masks(nums)
+    if not solve_masks(nums, row_mask, col_mask, box_mask):
+        sys.exit("The board cannot be solved")
 
-    row, col = find
-    for num in range(1, 10):
-        if valid(bo, num, (row, col)):
-            bo[row][col] = num
-            if solve(bo):
-                return True
+    for i in range(9):
+        print("".join(str(num) for num in nums[i * 9:(i + 1) * 9]))
 
-    bo[row][col] = 0
-    return False
\ No newline at end of file
+if __name__ == '__main__':
+    main()
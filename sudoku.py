@@ -2,7 +2,9 @@
 
 import pygame
 from generate import generate_board
-import time
+from solver import BOXES, find_fewest_options, solve_masks
+from itertools import islice
+import threading
 
 SCREEN_WIDTH = 540
 SCREEN_HEIGHT = 600
@@ -18,6 +20,8 @@ CROSS_COLOR = (255, 0, 0)
 CROSS_POS = (20, 560)
 INCRCT_COLOR = (0, 0, 0)
 INCRCT_POS = (40, 560)
+STATUS_RECT = pygame.Rect(0, SCREEN_WIDTH + BOARDER_THICK_WIDTH, SCREEN_WIDTH,
+                          SCREEN_HEIGHT - SCREEN_WIDTH - BOARDER_THICK_WIDTH)
 
 FONT_SIZE = 40
 SYSTEM_FONT = "comicsans"
@@ -31,6 +35,10 @@ PROGRESS_COLOR = (0, 255, 0)
 DRAFT_SHIFT = 5
 
 SOLVE_PAUSE_TIME = 10
+FPS = 60
+DIGIT_KEYS = {key: num for num in range(1, 10) 
+              for key in (getattr(pygame, "K_" + str(num)), 
+                          getattr(pygame, "K_KP" + str(num)))}
 
 END_GAME_DELAY = 5000
 RESULT_COLOR = (0, 0, 0)
@@ -41,21 +49,41 @@ MSG_Y = 400
 rows = 9
 cols = 9
 
+font_cache = {}
+glyph_cache = {}
+frame_cache = {}
+status_cache = {}
+text_cache = {}
+
 class Board(object):
     '''
     Fields:
         width (Nat)
         height (Nat)
         boxes (listof Box)
+        nums (listof Nat)
+        empty (Nat)
         box_selected (tupleof Nat Nat)
+        row_mask (listof Nat)
+        col_mask (listof Nat)
+        box_mask (listof Nat)
+        lines (listof Rect)
+        background (anyof Surface None)
+        dirty (setof (tupleof Nat Nat))
+        redraw_all (Bool)
 
     Requires:
         0 < width, height
         boxes is a valid sudoku grid with 81 boxes
+        nums has 81 elements, the number in the box on position (i, j) is
+            nums[i * cols + j] (0 if the box is empty)
+        empty is the number of 0s in nums
         values in box_selected < 9
+        bit n - 1 of row_mask[i], col_mask[j] and box_mask[k] is set if and
+            only if n is in row i, column j and 3x3 box k respectively
     '''
 
-    box_dim = SCREEN_WIDTH / cols
+    box_dim = SCREEN_WIDTH // cols
 
     def __init__(self, width, height):
         '''
@@ -69,27 +97,65 @@ class Board(object):
         self.width = width
         self.height = height
         self.boxes = []
+        self.nums = [0] * (rows * cols)
+        self.empty = rows * cols
         self.box_selected = None
+        self.row_mask = [0] * rows
+        self.col_mask = [0] * cols
+        self.box_mask = [0] * rows
+        self.lines = []
+        self.background = None
+        self.dirty = set()
+        self.redraw_all = True
+
+        ## each line is the rect a line of its width centred on the boarder
+        ##   between two rows or columns of boxes covers
+        for i in range(rows + 1):
+            if i % 3 == 0 and i:
+                line_width = BOARDER_THICK_WIDTH
+            else:
+                line_width = BOARDER_THIN_WIDTH
+            shift = i * self.box_dim - (line_width - 1) // 2
+            length = self.width + 1
+            self.lines.append(pygame.Rect(0, shift, length, line_width))
+            self.lines.append(pygame.Rect(shift, 0, line_width, length))
 
-    def init_boxes(self):
+    def init_boxes(self, bo):
         '''
-        Initalizes boxes for the sudoku board
+        Initalizes boxes for the sudoku board with the numbers in bo, or a
+            newly generated board if bo is None, reusing the boxes and the
+            background of the previous board if there is one
 
         Effects: mutates self
 
-        init_boxes: Board -> None
+        init_boxes: Board (anyof (listof (listof Nat)) None) -> None
         '''
-        bo = generate_board()
-        for i in range(len(bo)):
-            col = []
-            for j in range(len(bo[0])):
-                if bo[i][j] == 0:
-                    col.append(Box(bo[i][j], j * self.box_dim, 
-                                    i * self.box_dim, False))
-                else:
-                    col.append(Box(bo[i][j], j * self.box_dim, 
-                                    i * self.box_dim, True))
-            self.boxes.append(col)
+        if bo is None:
+            bo = generate_board()
+        if not self.boxes:
+            for i in range(rows):
+                self.boxes.append([Box(j * self.box_dim, i * self.box_dim, 
+                                       False) for j in range(cols)])
+
+        self.nums = [0] * (rows * cols)
+        self.empty = rows * cols
+        self.box_selected = None
+        self.row_mask = [0] * rows
+        self.col_mask = [0] * cols
+        self.box_mask = [0] * rows
+        self.dirty.clear()
+        self.redraw_all = True
+        for i in range(rows):
+            for j in range(cols):
+                box = self.boxes[i][j]
+                box.draft = 0
+                box.selected = False
+                box.fixed = bo[i][j] != 0
+                if box.fixed:
+                    self.place_num(i, j, int(bo[i][j]))
+
+        if self.background:
+            self.init_background(self.background)
 
     def select_box(self, row, col):
         '''
@@ -104,8 +170,10 @@ class Board(object):
             if self.box_selected:
                 r, c = self.box_selected
                 self.boxes[r][c].selected = False
+                self.dirty.add(self.box_selected)
             self.boxes[row][col].selected = True
             self.box_selected = (row, col)
+            self.dirty.add(self.box_selected)
 
     def set_draft(self, num):
         '''
@@ -118,6 +186,7 @@ class Board(object):
                   a box is selected (not None)
         '''
         self.boxes[self.box_selected[0]][self.box_selected[1]].draft = num
+        self.dirty.add(self.box_selected)
 
     def clear_draft(self):
         '''
@@ -130,16 +199,42 @@ class Board(object):
         '''
         self.set_draft(0)
 
-    def find_empty(self):
+    def place_num(self, row, col, num):
         '''
-        Finds the position of the next box that is unfilled
+        Places num in the box on position (row, col) and records it in the
+            masks of its row, column and 3x3 box
+
+        Effects: mutates self
 
-        find_empty: Board -> (tupleof Nat Nat)
+        place_num: Board Nat Nat Nat -> None
+        Requires: 0 < num <= 9
+                  row, col < 9
+                  the box on position (row, col) is empty
         '''
-        for i in range(len(self.boxes)):
-            for j in range(len(self.boxes[0])):
-                if self.boxes[i][j].num == 0:
-                    return (i, j)
+        bit = 1 << (num - 1)
+        self.nums[row * cols + col] = num
+        self.empty -= 1
+        self.row_mask[row] |= bit
+        self.col_mask[col] |= bit
+        self.box_mask[BOXES[row * cols + col]] |= bit
+
+    def remove_num(self, row, col):
+        '''
+        Empties the box on position (row, col) and clears its number from the
+            masks of its row, column and 3x3 box
+
+        Effects: mutates self
+
+        remove_num: Board Nat Nat -> None
+        Requires: row, col < 9
+                  the box on position (row, col) is not empty
+        '''
+        bit = ~(1 << (self.nums[row * cols + col] - 1))
+        self.nums[row * cols + col] = 0
+        self.empty += 1
+        self.row_mask[row] &= bit
+        self.col_mask[col] &= bit
+        self.box_mask[BOXES[row * cols + col]] &= bit
 
     def is_valid_board(self, num, pos):
         '''
@@ -147,25 +242,24 @@ class Board(object):
 
         is_valid_board: Board Nat (tupleof Nat Nat) -> Bool
         Requires: 0 < num <= 9
-                  pos is a valid position
+                  pos is a valid position of an empty box
         '''
-        for i in range(len(self.boxes[0])):
-            if self.boxes[pos[0]][i].num == num and pos[1] != i:
-                return False
-    
-        for i in range(len(self.boxes)):
-            if self.boxes[i][pos[1]].num == num and pos[0] != i:
-                return False
+        row, col = pos
+        used = (self.row_mask[row] | self.col_mask[col] | 
+                self.box_mask[BOXES[row * cols + col]])
+        return not (used >> (num - 1)) & 1
 
-        box_cow = pos[1] // 3
-        box_row = pos[0] // 3
-
-        for i in range(box_row * 3, box_row * 3 + 3):
-            for j in range(box_cow * 3, box_cow * 3 + 3):
-                if self.boxes[i][j].num == num and (i, j) != pos:
-                    return False
+    def get_solution(self):
+        '''
+        Returns the numbers of the solved sudoku board in the same order as
+            nums, or None if the board cannot be solved (self is not changed)
 
-        return True
+        get_solution: Board -> (anyof (listof Nat) None)
+        '''
+        solution = self.nums[:]
+        if solve_masks(solution, self.row_mask[:], self.col_mask[:], 
+                       self.box_mask[:]):
+            return solution
 
     def solve_board(self):
         '''
@@ -175,34 +269,15 @@ class Board(object):
 
         solve_board: Board -> Bool
         '''
-        find = self.find_empty()
-        if not find:
-            return True
+        solution = self.get_solution()
+        if not solution:
+            return False
 
-        row, col = find
-        for num in range(1, 10):
-            if self.is_valid_board(num, (row, col)):
-                self.boxes[row][col].num = num
-                if self.solve_board():
-                    return True
-        self.boxes[row][col].num = 0
-        return False
-
-    def copy_board(self):
-        '''
-        Returns a board with the same dimensions and the same progress
-            (only has the same numbers not the drafts)
-
-        copy_board: Board -> Board
-        '''
-        duplicate = Board(self.width, self.height)
-        og = self.boxes
-        for i in range(len(og)):
-            col = []
-            for j in range(len(og[0])):
-                col.append(Box(og[i][j].num, 0, 0, True))
-            duplicate.boxes.append(col)
-        return duplicate
+        for i in range(rows):
+            for j in range(cols):
+                if self.nums[i * cols + j] == 0:
+                    self.place_num(i, j, solution[i * cols + j])
+        return True
 
     def set_num(self):
         '''
@@ -216,14 +291,14 @@ class Board(object):
         row, col = self.box_selected
         draft = self.boxes[row][col].draft
         if draft != 0:
-            if self.boxes[row][col].num == 0:
+            self.dirty.add(self.box_selected)
+            if self.nums[row * cols + col] == 0:
                 if self.is_valid_board(draft, self.box_selected):
-                    self.boxes[row][col].num = draft
-                    dup = self.copy_board()
-                    if dup.solve_board():
+                    self.place_num(row, col, draft)
+                    if self.get_solution():
                         self.boxes[row][col].draft = 0
                         return True
-                self.boxes[row][col].num = 0
+                    self.remove_num(row, col)
                 self.boxes[row][col].draft = 0
                 return False
     
@@ -233,11 +308,7 @@ class Board(object):
 
         is_completed: Board -> Bool
         '''
-        for i in range(len(self.boxes)):
-            for j in range(len(self.boxes[0])):
-                if self.boxes[i][j].num == 0:
-                    return False
-        return True
+        return self.empty == 0
 
     def mouse_selection(self, pos):
         '''
@@ -245,11 +316,11 @@ class Board(object):
 
         mouse_selection: Board (tupleof Nat Nat) -> 
                                                 (anyof None (tupleof Nat Nat))
-        Requires: 0 <= pos[0] <= self.width
+        Requires: 0 <= pos[0] < self.width
                   0 <= pos[1]
         '''
-        if 0 <= pos[1] <= self.height:
-            return (int(pos[1] // self.box_dim), int(pos[0] // self.box_dim))
+        if 0 <= pos[1] < self.height:
+            return (pos[1] // self.box_dim, pos[0] // self.box_dim)
         return None
 
     def draw_lines(self, win):
@@ -260,32 +331,72 @@ class Board(object):
 
         draw_lines: Board Window -> None
         '''
-        for i in range(rows):
-            if i % 3 == 0 and i:
-                line_width = BOARDER_THICK_WIDTH
-            else:
-                line_width = BOARDER_THIN_WIDTH
-            pygame.draw.line(win, BOARDER_COLOR, (0, i * self.box_dim),
-                             (self.width, self.box_dim * i), line_width)
-            pygame.draw.line(win, BOARDER_COLOR, (i * self.box_dim, 0),
-                             (i * self.box_dim, self.height), line_width)
-        pygame.draw.line(win, BOARDER_COLOR, (0, self.width), 
-                         (self.width, self.width), BOARDER_THICK_WIDTH)
-        pygame.draw.line(win, BOARDER_COLOR, (self.width, 0), 
-                         (self.width, self.width), BOARDER_THICK_WIDTH) 
+        for line in self.lines:
+            win.fill(BOARDER_COLOR, line)
     
-    def draw(self, win):
+    def init_background(self, win):
         '''
-        Draws the sudoku board on win
+        Renders the parts of the sudoku board that do not change during a game,
+            the lines and the fixed numbers, onto a surface the size of win
+            (the surface is only created the first time)
 
-        Effects: mutates win
+        Effects: mutates self
 
-        draw: Board Window -> None
+        init_background: Board Window -> None
         '''
-        self.draw_lines(win)         
+        if not self.background:
+            self.background = pygame.Surface(win.get_size()).convert()
+        self.background.fill(BG_COLOR)
+        self.draw_lines(self.background)
         for i in range(rows):
             for j in range(cols):
-                self.boxes[i][j].draw(win)
+                if self.boxes[i][j].fixed:
+                    self.boxes[i][j].draw(self.background,
+                                          self.nums[i * cols + j])
+
+    def draw(self, win):
+        '''
+        Draws the boxes of the sudoku board that changed since the last draw
+            on win, or the whole board if redraw_all is set, and returns the
+            areas of win that were drawn
+
+        Effects: mutates self, win
+
+        draw: Board Window -> (listof Rect)
+        '''
+        if not self.background:
+            self.init_background(win)
+        if not (self.dirty or self.redraw_all):
+            return []
+
+        blits = []
+        rects = []
+        if self.redraw_all:
+            blits.append((self.background, (0, 0)))
+            rects.append(win.get_rect())
+            for i in range(rows):
+                for j in range(cols):
+                    if not self.boxes[i][j].fixed:
+                        self.dirty.add((i, j))
+
+        for row, col in self.dirty:
+            box = self.boxes[row][col]
+            if not self.redraw_all:
+                blits.append((self.background, box.rect, box.rect))
+                rects.append(box.rect)
+            content = box.get_blit(self.nums[row * cols + col])
+            if content:
+                blits.append(content)
+        win.blits(blits, False)
+
+        if self.box_selected in self.dirty:
+            box = self.boxes[self.box_selected[0]][self.box_selected[1]]
+            if box.selected:
+                pygame.draw.rect(win, SELECTED_COLOR, box.rect, 
+                                 BOX_BOARDER_WIDTH)
+        self.redraw_all = False
+        self.dirty.clear()
+        return rects
 
     def print_board_num(self):
         '''
@@ -298,12 +409,12 @@ class Board(object):
         for i in range(len(self.boxes)):
             if i % 3 == 0 and i:
                 print("- - - - - - - - - - -")
+            row = []
             for j in range(len(self.boxes[0])):
                 if j % 3 == 0 and j:
-                    print("| ", end="")
-                print(str(self.boxes[i][j].num) + " ", end="")
-                if j == 8:
-                    print("")
+                    row.append("|")
+                row.append(str(self.nums[i * cols + j]))
+            print(" ".join(row) + " ")
 
     def print_board_draft(self):
         '''
@@ -311,17 +422,17 @@ class Board(object):
 
         Effects: printing to screen
 
-        print_board_num: Board -> None
+        print_board_draft: Board -> None
         '''
         for i in range(len(self.boxes)):
             if i % 3 == 0 and i:
                 print("- - - - - - - - - - -")
+            row = []
             for j in range(len(self.boxes[0])):
                 if j % 3 == 0 and j:
-                    print("| ", end="")
-                print(str(self.boxes[i][j].draft) + " ", end="")
-                if j == 8:
-                    print("")
+                    row.append("|")
+                row.append(str(self.boxes[i][j].draft))
+            print(" ".join(row) + " ")
 
     def redraw_select(self, win):
         '''
@@ -340,142 +451,259 @@ class Board(object):
             self.draw_lines(win)         
             for i in range(rows):
                 for j in range(cols):
-                    self.boxes[i][j].draw_num_only(win)
+                    self.boxes[i][j].draw_num_only(win, self.nums[i * cols + j])
             pygame.display.update()
 
 
-    def visualize_solve(self, win):
+    def solve_steps(self):
         '''
-        Draws the solving process of the sudoku board on win
+        Solves the sudoku board, yielding the position of the box changed by
+            each step of the solving process and whether the step backtracks.
+            The empty box with the fewest options is filled in first
 
-        Effects: mutates self, win
-                 print to pygame window
+        Effects: mutates self
 
-        visualize_solve: Board Window -> None
-        '''
-        find = self.find_empty()
-        if not find:
-            return True
+        solve_steps: Board -> (generatorof (tupleof Nat Nat Bool))
+        '''
+        ## stack holds the index of each box filled in so far along with the
+        ##   bitmask of the numbers left to try in it
+        stack = []
+        find = find_fewest_options(self.nums, self.row_mask, self.col_mask,
+                                   self.box_mask)
+        while find:
+            k, options = find
+            row, col = divmod(k, cols)
+            if options:
+                bit = options & -options
+                self.place_num(row, col, bit.bit_length())
+                yield (row, col, False)
+                stack.append((k, options ^ bit))
+                find = find_fewest_options(self.nums, self.row_mask, 
+                                           self.col_mask, self.box_mask)
+            elif stack:
+                find = stack.pop()
+                row, col = divmod(find[0], cols)
+                self.remove_num(row, col)
+                yield (row, col, True)
+            else:
+                return False
 
-        row, col = find
-        for num in range(1, 10):
-            if self.is_valid_board(num, (row, col)):
-                self.boxes[row][col].num = num
-                self.boxes[row][col].draw_solve(win, False)
-                pygame.display.update()
-                pygame.time.delay(SOLVE_PAUSE_TIME)
+        return True
 
-                if self.visualize_solve(win):
-                    return True
+    def visualize_solve(self, win, steps, count):
+        '''
+        Draws the next count steps of the solving process, steps, on win, or
+            all the remaining steps if count is None. Returns False once the
+            solving process is over
 
-                self.boxes[row][col].num = 0
-                self.boxes[row][col].draw_solve(win, True)
-                pygame.display.update()
-                pygame.time.delay(SOLVE_PAUSE_TIME)
+        Effects: mutates self, win
+                 print to pygame window
 
-        return False
+        visualize_solve: Board Window (generatorof (tupleof Nat Nat Bool))
+                         (anyof Nat None) -> Bool
+        '''
+        ## only the boxes drawn are updated on the screen, each one once
+        drawn = 0
+        dirty = {}
+        for row, col, backtrack in islice(steps, count):
+            box = self.boxes[row][col]
+            box.draw_solve(win, self.nums[row * cols + col], backtrack)
+            dirty[row * cols + col] = box.rect
+            drawn += 1
+        if dirty:
+            pygame.display.update(list(dirty.values()))
+
+        if count is None or drawn < count:
+            self.redraw_all = True
+            return False
+        return True
 
 
 class Box(object):
     '''
     Fields:
-        num (Nat)
         draft (Nat)
-        x (Float)
-        y (Float)
+        x (Nat)
+        y (Nat)
+        rect (Rect)
         fixed (Bool)
         selected (Bool)
 
-    Requires: 0 <= num, draft <= 9
+    Requires: 0 <= draft <= 9
               0 <= x, y <= SCREEN_WIDTH - side
     '''
 
-    side = SCREEN_WIDTH / cols
+    __slots__ = ('draft', 'x', 'y', 'rect', 'fixed', 'selected')
 
-    def __init__(self, num, x, y, fixed):
+    side = SCREEN_WIDTH // cols
+
+    def __init__(self, x, y, fixed):
         '''
-        Constructor: create a Box object by calling Box(num, x, y, fixed)
+        Constructor: create a Box object by calling Box(x, y, fixed)
 
         Effects: mutates self
 
-        __init__: Nat Float Float Bool -> None
-        Requires: 0 <= num <= 9
-                  0 <= x, y <= SCREEN_WIDTH - side
+        __init__: Nat Nat Bool -> None
+        Requires: 0 <= x, y <= SCREEN_WIDTH - side
         '''
-        self.num = num
         self.draft = 0
         self.x = x
         self.y = y
+        self.rect = pygame.Rect(x, y, self.side, self.side)
         self.fixed = fixed
         self.selected = False
         
-    def draw(self, win):
+    def get_blit(self, num):
         '''
-        Draws the box on win
-
-        Effects: may mutate win
+        Returns the surface showing the content of the box holding num and
+            where to blit it, or None if the box shows nothing
 
-        draw: Board Window -> None
+        get_blit: Box Nat -> (anyof (tupleof Surface (tupleof Nat Nat)) None)
+        Requires: 0 <= num <= 9
         '''
-        font = pygame.font.SysFont(SYSTEM_FONT, FONT_SIZE)
-
-        if self.draft != 0 and self.num == 0:
-            draft = font.render(str(self.draft), 1, DRAFT_COLOR)
-            win.blit(draft, (self.x + DRAFT_SHIFT, self.y + DRAFT_SHIFT))
-        elif self.num != 0:
+        if self.draft != 0 and num == 0:
+            draft = get_glyph(self.draft, DRAFT_COLOR)[0]
+            return (draft, (self.x + DRAFT_SHIFT, self.y + DRAFT_SHIFT))
+        elif num != 0:
             render_color = VALUE_COLOR
             if self.fixed:
                 render_color = FIXED_COLOR
-            num = font.render(str(self.num), 1, render_color)
-            win.blit(num, (self.x + (self.side / 2 - num.get_width() / 2), 
-                           self.y + (self.side / 2 - num.get_height() / 2)))
+            glyph, dx, dy = get_glyph(num, render_color)
+            return (glyph, (self.x + dx, self.y + dy))
+        return None
+
+    def draw(self, win, num):
+        '''
+        Draws the box holding num on win
+
+        Effects: may mutate win
+
+        draw: Box Window Nat -> None
+        Requires: 0 <= num <= 9
+        '''
+        content = self.get_blit(num)
+        if content:
+            win.blit(*content)
 
         if self.selected:
-            pygame.draw.rect(win, SELECTED_COLOR, 
-                             (self.x , self.y, self.side, self.side), 
-                             BOX_BOARDER_WIDTH)
+            pygame.draw.rect(win, SELECTED_COLOR, self.rect, BOX_BOARDER_WIDTH)
 
-    def draw_num_only(self, win):
+    def draw_num_only(self, win, num):
         '''
-        Draws the box and its number only
+        Draws the box and its number, num, only
 
         Effects: may mutate win
 
-        draw: Board Window -> None
+        draw_num_only: Box Window Nat -> None
+        Requires: 0 <= num <= 9
         '''
-        font = pygame.font.SysFont(SYSTEM_FONT, FONT_SIZE)
-
-        if self.num != 0:
+        if num != 0:
             render_color = VALUE_COLOR
             if self.fixed:
                 render_color = FIXED_COLOR
-            num = font.render(str(self.num), 1, render_color)
-            win.blit(num, (self.x + (self.side / 2 - num.get_width() / 2), 
-                           self.y + (self.side / 2 - num.get_height() / 2)))
+            glyph, dx, dy = get_glyph(num, render_color)
+            win.blit(glyph, (self.x + dx, self.y + dy))
 
     
-    def draw_solve(self, win, backtrack):
+    def draw_solve(self, win, num, backtrack):
         '''
-        Draw the box on win when drawing the solving process of the board
+        Draw the box holding num on win when drawing the solving process of
+            the board
 
         Effects: mutates win
 
-        draw_solve: Board Window Bool -> None
+        draw_solve: Box Window Nat Bool -> None
+        Requires: 0 <= num <= 9
         '''
-        font = pygame.font.SysFont(SYSTEM_FONT, FONT_SIZE)
-        box_dim = (self.x, self.y, self.side, self.side)
-        pygame.draw.rect(win, BG_COLOR, box_dim, 0)
-
-        if self.num:
-            num = font.render(str(self.num), 1, FIXED_COLOR)
-            win.blit(num, (self.x + (self.side / 2 - num.get_width() / 2), 
-                        self.y + (self.side / 2 - num.get_height() / 2)))
         if backtrack:
-            pygame.draw.rect(win, SELECTED_COLOR, box_dim, BOX_BOARDER_WIDTH)
+            win.blit(get_frame(SELECTED_COLOR), self.rect)
         else:
-            pygame.draw.rect(win, PROGRESS_COLOR, box_dim, BOX_BOARDER_WIDTH)
+            win.blit(get_frame(PROGRESS_COLOR), self.rect)
+
+        if num:
+            glyph, dx, dy = get_glyph(num, FIXED_COLOR)
+            win.blit(glyph, (self.x + dx, self.y + dy))
         
-                         
+
+def get_font(size):
+    '''
+    Returns the system font in size, loading it the first time it is 
+        requested
+
+    Effects: may mutate font_cache
+
+    get_font: Nat -> Font
+    Requires: pygame.font is initialized
+    '''
+    if size not in font_cache:
+        font_cache[size] = pygame.font.SysFont(SYSTEM_FONT, size)
+    return font_cache[size]
+
+def get_glyph(num, color):
+    '''
+    Returns the rendered surface of num in color along with the offsets that
+        centre it in a box. The glyphs of all 9 digits in color are rendered
+        the first time one of them is requested and reused afterwards
+
+    Effects: may mutate glyph_cache
+
+    get_glyph: Nat (tupleof Nat Nat Nat) -> (tupleof Surface Nat Nat)
+    Requires: 0 < num <= 9
+    '''
+    if (num, color) not in glyph_cache:
+        font = get_font(FONT_SIZE)
+        for digit in range(1, 10):
+            text = font.render(str(digit), 1, color).convert_alpha()
+            glyph_cache[(digit, color)] = (
+                text, (Box.side - text.get_width()) // 2,
+                (Box.side - text.get_height()) // 2)
+    return glyph_cache[(num, color)]
+
+def get_frame(color):
+    '''
+    Returns an empty box with a boarder in color, rendering it the first time
+        it is requested
+
+    Effects: may mutate frame_cache
+
+    get_frame: (tupleof Nat Nat Nat) -> Surface
+    '''
+    if color not in frame_cache:
+        frame = pygame.Surface((Box.side, Box.side)).convert()
+        frame.fill(BG_COLOR)
+        pygame.draw.rect(frame, color, frame.get_rect(), BOX_BOARDER_WIDTH)
+        frame_cache[color] = frame
+    return frame_cache[color]
+
+def render_status(field, text, color):
+    '''
+    Returns text rendered in color for the status line field, reusing the
+        surface rendered for field last time if its text has not changed
+
+    Effects: may mutate status_cache
+
+    render_status: Str Str (tupleof Nat Nat Nat) -> Surface
+    '''
+    if field not in status_cache or status_cache[field][0] != text:
+        font = get_font(FONT_SIZE)
+        status_cache[field] = (text, 
+                               font.render(text, 1, color).convert_alpha())
+    return status_cache[field][1]
+
+def render_text(text, color):
+    '''
+    Returns the static label text rendered in color, rendering it the first
+        time it is requested
+
+    Effects: may mutate text_cache
+
+    render_text: Str (tupleof Nat Nat Nat) -> Surface
+    '''
+    if (text, color) not in text_cache:
+        font = get_font(FONT_SIZE)
+        text_cache[(text, color)] = font.render(text, 1, color).convert_alpha()
+    return text_cache[(text, color)]
+
 def get_time(secs):
     '''
     Returns a formatted time of secs
@@ -486,30 +714,46 @@ def get_time(secs):
     minute = secs // 60
     return str(minute) + ":" + str(second)
 
-def draw_window(win, bo, time, incorrect):
+def pregenerate(boards):
     '''
-    Draws the sudoku board, bo, the play time and the number of incorrect 
-        fillings on win
+    Generates a sudoku board and adds it to boards, so that the next round
+        can start without waiting for it
 
-    Effects: mutates win
+    Effects: mutates boards
+
+    pregenerate: (listof (listof (listof Nat))) -> None
+    '''
+    boards.append(generate_board())
+
+def draw_window(win, bo, time, incorrect, redraw_status):
+    '''
+    Draws the changed parts of the sudoku board, bo, on win, along with the
+        play time and the number of incorrect fillings if redraw_status is
+        True or the whole board is redrawn
+
+    Effects: mutates bo, win
              print to pygame window
 
-    draw_window: Window Board Nat Nat -> None
+    draw_window: Window Board Nat Nat Bool -> None
     '''
-    win.fill(BG_COLOR)
-    font = pygame.font.SysFont(SYSTEM_FONT, FONT_SIZE)
+    redraw_status = redraw_status or bo.redraw_all
+    rects = bo.draw(win)
 
-    text = font.render("Time: " + get_time(time), 1, TIME_COLOR)
-    win.blit(text, TIME_POS)
+    if redraw_status:
+        win.blit(bo.background, STATUS_RECT, STATUS_RECT)
 
-    cross = font.render("X", 1, CROSS_COLOR)
-    win.blit(cross, CROSS_POS)
-    times = font.render(": " + str(incorrect), 1, INCRCT_COLOR)
-    win.blit(times, INCRCT_POS)
+        text = render_status("time", "Time: " + get_time(time), TIME_COLOR)
+        win.blit(text, TIME_POS)
 
-    bo.draw(win)
+        cross = render_text("X", CROSS_COLOR)
+        win.blit(cross, CROSS_POS)
+        times = render_status("incorrect", ": " + str(incorrect), 
+                              INCRCT_COLOR)
+        win.blit(times, INCRCT_POS)
+        rects.append(STATUS_RECT)
 
-    pygame.display.update()
+    if rects:
+        pygame.display.update(rects)
 
 def draw_game_result(win, time, incorrect):
     '''
@@ -522,7 +766,7 @@ def draw_game_result(win, time, incorrect):
     draw_game_result: Window Nat Nat -> None
     '''
     win.fill(BG_COLOR)
-    font = pygame.font.SysFont(SYSTEM_FONT, FONT_SIZE)
+    font = get_font(FONT_SIZE)
 
     time = font.render("Your time: " + get_time(time), 1, RESULT_COLOR)
     win.blit(time, (SCREEN_WIDTH / 2 - time.get_width() / 2, RESULT_TIME_Y))
@@ -531,7 +775,7 @@ def draw_game_result(win, time, incorrect):
     win.blit(mistakes, (SCREEN_WIDTH / 2 - mistakes.get_width() / 2, 
                          TOTAL_INCRT_Y))
 
-    text = font.render("Press any key to start a new game", 1, RESULT_COLOR)
+    text = render_text("Press any key to start a new game", RESULT_COLOR)
     win.blit(text, (SCREEN_WIDTH / 2 - text.get_width() / 2, MSG_Y))
 
     pygame.display.update()
@@ -545,57 +789,58 @@ def main():
     pygame.font.init()
     win = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("Sudoku")
-
+    pygame.event.set_blocked(None)
+    pygame.event.set_allowed([pygame.QUIT, pygame.KEYDOWN, 
+                              pygame.MOUSEBUTTONDOWN, pygame.VIDEOEXPOSE])
+
+    clock = pygame.time.Clock()
+    bo = Board(SCREEN_WIDTH, SCREEN_WIDTH)
+    boards = []
+    generator = None
     game = True
     while game:
-        bo = Board(SCREEN_WIDTH, SCREEN_WIDTH)
-        bo.init_boxes()
-        start = time.time()
+        if generator:
+            generator.join()
+        bo.init_boxes(boards.pop() if boards else None)
+        start = pygame.time.get_ticks()
         incorrect = 0
+        status = None
 
         solve_started = False
         rnd = True
         while rnd:
-            play_time = round(time.time() - start)
+            if not solve_started:
+                play_time = round((pygame.time.get_ticks() - start) / 1000)
             key = None
 
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     rnd = False
                     game = False
+                elif event.type == pygame.VIDEOEXPOSE:
+                    bo.redraw_all = True
 
                 if solve_started:
                     continue
                 
                 if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_1 or event.key == pygame.K_KP1:
-                        key = 1
-                    elif event.key == pygame.K_2 or event.key == pygame.K_KP2:
-                        key = 2
-                    elif event.key == pygame.K_3 or event.key == pygame.K_KP3:
-                        key = 3
-                    elif event.key == pygame.K_4 or event.key == pygame.K_KP4:
-                        key = 4
-                    elif event.key == pygame.K_5 or event.key == pygame.K_KP5:
-                        key = 5
-                    elif event.key == pygame.K_6 or event.key == pygame.K_KP6:
-                        key = 6
-                    elif event.key == pygame.K_7 or event.key == pygame.K_KP7:
-                        key = 7
-                    elif event.key == pygame.K_8 or event.key == pygame.K_KP8:
-                        key = 8
-                    elif event.key == pygame.K_9 or event.key == pygame.K_KP9:
-                        key = 9
+                    if event.key in DIGIT_KEYS:
+                        key = DIGIT_KEYS[event.key]
                     elif event.key == pygame.K_DELETE or \
                          event.key == pygame.K_BACKSPACE:
                         bo.clear_draft()
                         key = None
                     elif event.key == pygame.K_SPACE:
                         solve_started = True
-                        bo.redraw_select(win)
-                        bo.visualize_solve(win)
+                        if event.mod & pygame.KMOD_SHIFT:
+                            bo.solve_board()
+                            bo.redraw_all = True
+                            rnd = False
+                        else:
+                            bo.redraw_select(win)
+                            steps = bo.solve_steps()
+                            solve_time = pygame.time.get_ticks()
                         key = None
-                        rnd = False
                     elif event.key == pygame.K_RETURN:
                         set_result = bo.set_num()
                         if set_result == False:
@@ -605,18 +850,34 @@ def main():
                         key = None
 
                 if event.type == pygame.MOUSEBUTTONDOWN:
-                    mouse_pos = pygame.mouse.get_pos()
-                    selected_box = bo.mouse_selection(mouse_pos)
+                    selected_box = bo.mouse_selection(event.pos)
                     if selected_box:
                         bo.select_box(selected_box[0], selected_box[1])
                         key = None
             
             if bo.box_selected and key:
                 bo.set_draft(key)
-                    
-            draw_window(win, bo, play_time, incorrect)
+
+            if solve_started and rnd:
+                count = None
+                if SOLVE_PAUSE_TIME:
+                    count = ((pygame.time.get_ticks() - solve_time) // 
+                             SOLVE_PAUSE_TIME)
+                    solve_time += count * SOLVE_PAUSE_TIME
+                if not bo.visualize_solve(win, steps, count):
+                    rnd = False
+
+            if not solve_started or not rnd:
+                draw_window(win, bo, play_time, incorrect,
+                            (play_time, incorrect) != status)
+                status = (play_time, incorrect)
+            clock.tick(FPS)
         
         if game:
+            ## the next board is generated while the result is shown
+            generator = threading.Thread(target=pregenerate, args=(boards,),
+                                         daemon=True)
+            generator.start()
             pygame.time.delay(END_GAME_DELAY)
             draw_game_result(win, play_time, incorrect)
             
@@ -628,6 +889,7 @@ def main():
                         another_one = False
                     elif event.type == pygame.KEYDOWN:
                         another_one = False
+                clock.tick(FPS)
 
     pygame.quit()
 